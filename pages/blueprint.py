@@ -1,4 +1,5 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
 
 st.set_page_config(page_title="Question Paper Blueprint Generator", layout="wide")
@@ -9,90 +10,76 @@ st.caption("Supports sub-questions (2M + 3M from Q4 onwards)")
 # -------------------------
 # CONFIG
 # -------------------------
-UNITS = [
+# Tuples: option lists are hashed for widget diffing every rerun, and
+# immutable constants avoid rebuilding/re-hashing fresh lists
+UNITS = (
     "Unit 8: Application of Percentages",
     "Unit 9: Rational Numbers",
     "Unit 10: Algebraic Expressions & Equations",
     "Unit 11: Mensuration",
     "Unit 12: Sets",
     "Unit 13: Probability"
-]
+)
 
-DIFFICULTY = ["Easy", "Medium", "HOTS"]
-Q_TYPE = ["Objective", "Subjective"]
+DIFFICULTY = ("Easy", "Medium", "HOTS")
+Q_TYPE = ("Objective", "Subjective")
 
 # -------------------------
 # QUESTION TAGGING
 # -------------------------
 st.subheader("📝 Question Tagging")
 
-question_data = []
-
-# Q1 to Q3 (single questions)
-for q in range(1, 4):
-    with st.container(border=True):
-        st.markdown(f"### Question {q}")
-
-        col1, col2, col3, col4 = st.columns(4)
-
-        unit = col1.selectbox("Unit", ["Select"] + UNITS, key=f"unit_{q}")
-        difficulty = col2.selectbox("Difficulty", DIFFICULTY, key=f"difficulty_{q}")
-        marks = col3.selectbox("Marks", [1], key=f"marks_{q}")
-        q_type = col4.selectbox("Question Type", Q_TYPE, key=f"type_{q}")
-
-        if unit != "Select":
-            question_data.append({
-                "Question": f"Q{q}",
-                "Unit": unit,
-                "Difficulty": difficulty,
-                "Marks": 1,
-                "Type": q_type
-            })
-
-# Q4 to Q10 (sub-questions)
-for q in range(4, 11):
-    with st.container(border=True):
-        st.markdown(f"### Question {q}")
-
-        col1, col2, col3, col4 = st.columns(4)
-        st.markdown("**(i) – 2 Marks**")
-
-        unit_i = col1.selectbox("Unit", ["Select"] + UNITS, key=f"unit_{q}a")
-        diff_i = col2.selectbox("Difficulty", DIFFICULTY, key=f"diff_{q}a")
-        col3.selectbox("Marks", [2], key=f"marks_{q}a")
-        type_i = col4.selectbox("Question Type", Q_TYPE, key=f"type_{q}a")
-
-        if unit_i != "Select":
-            question_data.append({
-                "Question": f"Q{q}(i)",
-                "Unit": unit_i,
-                "Difficulty": diff_i,
-                "Marks": 2,
-                "Type": type_i
-            })
-
-        st.divider()
-
-        col1, col2, col3, col4 = st.columns(4)
-        st.markdown("**(ii) – 3 Marks**")
-
-        unit_ii = col1.selectbox("Unit", ["Select"] + UNITS, key=f"unit_{q}b")
-        diff_ii = col2.selectbox("Difficulty", DIFFICULTY, key=f"diff_{q}b")
-        col3.selectbox("Marks", [3], key=f"marks_{q}b")
-        type_ii = col4.selectbox("Question Type", Q_TYPE, key=f"type_{q}b")
-
-        if unit_ii != "Select":
-            question_data.append({
-                "Question": f"Q{q}(ii)",
-                "Unit": unit_ii,
-                "Difficulty": diff_ii,
-                "Marks": 3,
-                "Type": type_ii
-            })
+def _template_df():
+    """One row per (sub-)question: Q1-Q3 single 1-markers, Q4-Q10 with
+    2-mark (i) and 3-mark (ii) parts."""
+    rows = [
+        {"Question": f"Q{q}", "Unit": None,
+         "Difficulty": "Easy", "Marks": 1, "Type": "Objective"}
+        for q in range(1, 4)
+    ]
+    for q in range(4, 11):
+        rows.append({"Question": f"Q{q}(i)", "Unit": None,
+                     "Difficulty": "Easy", "Marks": 2, "Type": "Objective"})
+        rows.append({"Question": f"Q{q}(ii)", "Unit": None,
+                     "Difficulty": "Easy", "Marks": 3, "Type": "Objective"})
+    return pd.DataFrame(rows)
+
+if "questions" not in st.session_state:
+    st.session_state["questions"] = _template_df()
+
+# One data_editor instead of ~120 selectboxes: edits are diffed
+# client-side and there is no per-question container loop each rerun
+edited = st.data_editor(
+    st.session_state["questions"],
+    column_config={
+        "Question": st.column_config.TextColumn("Question", disabled=True),
+        "Unit": st.column_config.SelectboxColumn("Unit", options=UNITS),
+        "Difficulty": st.column_config.SelectboxColumn(
+            "Difficulty", options=DIFFICULTY, required=True
+        ),
+        "Marks": st.column_config.NumberColumn("Marks", disabled=True),
+        "Type": st.column_config.SelectboxColumn(
+            "Question Type", options=Q_TYPE, required=True
+        ),
+    },
+    num_rows="fixed",
+    hide_index=True,
+    use_container_width=True,
+    key="questions_editor"
+)
+
+# Rows without a Unit picked yet stay out of the blueprint
+question_data = edited.dropna(subset=["Unit"]).to_dict("records")
 
 # -------------------------
 # DATA PROCESSING
 # -------------------------
+@st.cache_data
+def _csv_bytes(rows, columns):
+    """Serialize rows once per distinct tagging state; reruns that don't
+    change the data reuse the cached bytes instead of re-encoding."""
+    return pd.DataFrame(list(rows), columns=list(columns)).to_csv(index=False).encode()
+
 if question_data:
     df = pd.DataFrame(question_data)
 
@@ -110,11 +97,9 @@ if question_data:
         if m not in blueprint.columns:
             blueprint[m] = 0
 
-    blueprint["Total Marks"] = (
-        blueprint[1] * 1 +
-        blueprint[2] * 2 +
-        blueprint[3] * 3
-    )
+    # Single dot product instead of three intermediate Series
+    marks_mat = blueprint[[1, 2, 3]].to_numpy()
+    blueprint["Total Marks"] = marks_mat @ np.array([1, 2, 3], dtype=marks_mat.dtype)
 
     blueprint = blueprint.rename(columns={
         1: "1 Mark",
@@ -127,16 +112,25 @@ if question_data:
 
     st.success(f"✅ Total Marks Covered: {blueprint['Total Marks'].sum()}")
 
+    blueprint_csv = _csv_bytes(
+        tuple(blueprint.itertuples(index=False, name=None)),
+        tuple(blueprint.columns)
+    )
+    mapping_csv = _csv_bytes(
+        tuple(df.itertuples(index=False, name=None)),
+        tuple(df.columns)
+    )
+
     st.download_button(
         "📥 Download Blueprint CSV",
-        blueprint.to_csv(index=False),
+        blueprint_csv,
         file_name="Blueprint_Summary.csv",
         mime="text/csv"
     )
 
     st.download_button(
         "📥 Download Question Mapping CSV",
-        df.to_csv(index=False),
+        mapping_csv,
         file_name="Question_Mapping.csv",
         mime="text/csv"
     )
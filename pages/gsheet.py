@@ -1,16 +1,27 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
 from datetime import datetime
-import gspread
 from google.oauth2.service_account import Credentials
+from googleapiclient.discovery import build
+from streamlit_autorefresh import st_autorefresh
 
 # --- CONFIG ---
 ROSTER_SHEET_NAME = "Roster"
 ATTENDANCE_LOG_SHEET_NAME = "FormResponses"
 
+# Only the columns the dashboard uses (ID/Name, Timestamp/ID), so the
+# API response skips the unused form columns entirely
+ROSTER_RANGE = f"{ROSTER_SHEET_NAME}!A:B"
+LOG_RANGE = f"{ATTENDANCE_LOG_SHEET_NAME}!A:B"
+
+# Single-column probe range for the change check below
+LOG_TS_RANGE = f"{ATTENDANCE_LOG_SHEET_NAME}!A:A"
+
 ROSTER_ID_COL = "ID"
 LOG_ID_COL = "ID"
 TIMESTAMP_COL = "Timestamp"
+TIMESTAMP_FMT = "%m/%d/%Y %H:%M:%S"  # fixed Google Forms timestamp format
 STATUS_COL = "Attendance Status"
 
 st.set_page_config(
@@ -20,131 +31,222 @@ st.set_page_config(
 )
 
 # ---- GOOGLE AUTH (Vercel Compatible) ----
-def get_gsheet_client():
-    """Authenticate using the service account stored in secrets.toml"""
+@st.cache_resource
+def get_sheets_service():
+    """Build a Sheets API service from the service account in secrets.toml
+
+    cache_resource keeps the authorized service (and its keep-alive HTTP
+    session) across reruns, so the JWT sign + token exchange happens once
+    per process instead of on every cache miss.
+    """
     creds_dict = st.secrets["gcp_sheets"]
 
     creds = Credentials.from_service_account_info(
         creds_dict,
-        scopes=["https://www.googleapis.com/auth/spreadsheets"]
+        scopes=["https://www.googleapis.com/auth/spreadsheets.readonly"]
     )
-    client = gspread.authorize(creds)
-    return client
+    return build("sheets", "v4", credentials=creds, cache_discovery=False)
 
 # ---- DATA LOADING ----
-@st.cache_data(ttl=10)
-def load_data():
-    try:
-        client = get_gsheet_client()
-
-        # Open spreadsheet using sheet ID (same block!)
-        spreadsheet_id = st.secrets["gcp_sheets"]["spreadsheet_id"]
-        sheet = client.open_by_key(spreadsheet_id)
-
-        # Load roster sheet
-        roster_ws = sheet.worksheet(ROSTER_SHEET_NAME)
-        df_roster = pd.DataFrame(roster_ws.get_all_records())
-        df_roster[ROSTER_ID_COL] = df_roster[ROSTER_ID_COL].astype(str)
-        df_roster = df_roster.set_index(ROSTER_ID_COL)
+def values_to_df(vals):
+    """Build a DataFrame from a raw values list (header row + data rows).
 
-        # Load attendance logs sheet
-        log_ws = sheet.worksheet(ATTENDANCE_LOG_SHEET_NAME)
-        df_log = pd.DataFrame(log_ws.get_all_records())
-        df_log[LOG_ID_COL] = df_log[LOG_ID_COL].astype(str)
-
-        # Present IDs
-        present_ids = set(df_log[LOG_ID_COL].unique())
-
-        # Status column
-        df_roster[STATUS_COL] = df_roster.index.map(
-            lambda x: "PRESENT" if x in present_ids else "ABSENT"
-        )
-
-        # Last timestamp
-        df_log[TIMESTAMP_COL] = pd.to_datetime(
-            df_log[TIMESTAMP_COL], errors="coerce"
-        )
-        last_time = df_log[TIMESTAMP_COL].max()
-        last_time = (
-            "N/A" if pd.isna(last_time)
-            else last_time.strftime("%Y-%m-%d %I:%M:%S %p")
-        )
-
-        return df_roster, last_time, present_ids
-
-    except Exception as e:
-        st.error("Error loading Google Sheet data.")
-        st.exception(e)
-        return pd.DataFrame(), "N/A", set()
+    Frames are converted to Arrow-backed dtypes: contiguous string
+    buffers hash faster in isin/unique and serialize zero-copy when
+    Streamlit ships the table to the frontend.
+    """
+    if not vals:
+        return pd.DataFrame()
+    df = pd.DataFrame(vals[1:], columns=vals[0])
+    return df.convert_dtypes(dtype_backend="pyarrow")
+
+def fetch_range(range_name):
+    """Fetch one range as a DataFrame (single values.get round-trip)."""
+    service = get_sheets_service()
+    spreadsheet_id = st.secrets["gcp_sheets"]["spreadsheet_id"]
+    resp = service.spreadsheets().values().get(
+        spreadsheetId=spreadsheet_id,
+        range=range_name,
+        majorDimension="ROWS"
+    ).execute()
+    return values_to_df(resp.get("values", []))
+
+def latest_log_timestamp():
+    """Cheap change probe: read only the log's timestamp column, so idle
+    polls cost one tiny read instead of both ranges.
+
+    Returns (row count, last cell): the count catches a scan landing in
+    the same second as the previous last row, which the second-resolution
+    timestamp alone would miss.
+    """
+    service = get_sheets_service()
+    spreadsheet_id = st.secrets["gcp_sheets"]["spreadsheet_id"]
+    resp = service.spreadsheets().values().get(
+        spreadsheetId=spreadsheet_id,
+        range=LOG_TS_RANGE,
+        majorDimension="COLUMNS"
+    ).execute()
+    cols = resp.get("values", [])
+    if not (cols and cols[0]):
+        return None
+    return len(cols[0]), cols[0][-1]
+
+@st.cache_data(ttl=3600)
+def load_roster():
+    """Roster barely changes during a trip, so it gets a 1h TTL and
+    stays out of the 10s refresh cycle entirely.
+
+    Fetch errors propagate to the caller: cache_data never stores a
+    raising call, so a transient failure can't pin an empty roster in
+    the cache for the rest of the hour.
+    """
+    # values.get returns formatted values, i.e. every cell is already
+    # a Python str — no astype(str) pass needed. The roster stays
+    # unindexed: tabs select by mask and render with hide_index=True,
+    # so a set_index/reset_index copy pair buys nothing.
+    return fetch_range(ROSTER_RANGE)
+
+@st.cache_data
+def load_log():
+    """Fetch errors propagate to the caller: cache_data never stores a
+    raising call, so a transient failure can't pin an empty frame in the
+    cache (there is no TTL to age it out — the change probe decides when
+    to refetch). IDs arrive as str from values.get — no astype(str)
+    pass needed."""
+    return fetch_range(LOG_RANGE)
 
 # ---- UI ----
 
-st.title("🚌 Live Trip Attendance Tracker")
-
-# QR Scanner Button
-st.markdown("### Scan Attendance")
-st.markdown(
-    """
+@st.cache_data(show_spinner=False)
+def qr_button_html():
+    """Constant scanner-link markup; cached so reruns reuse one string."""
+    return """
     <a href="https://rajasthan11.vercel.app" target="_blank">
         <button style="padding:10px 20px; font-size:18px; background:#2563eb; color:white; border:none; border-radius:8px;">
             📷 Open QR Scanner
         </button>
     </a>
-    """,
-    unsafe_allow_html=True
-)
+    """
+
+st.title("🚌 Live Trip Attendance Tracker")
+
+# QR Scanner Button
+st.markdown("### Scan Attendance")
+st.markdown(qr_button_html(), unsafe_allow_html=True)
 
 st.markdown("---")
 
-# Load Data
-df_attendance, last_update, present_ids = load_data()
+# Column config for the roster tables: the frontend formats the status
+# column itself, so no Python-side Styler walks the frame per rerun
+ROSTER_COLUMN_CONFIG = {
+    STATUS_COL: st.column_config.TextColumn(STATUS_COL, help="PRESENT or ABSENT")
+}
 
-# Manual Refresh Button
-if st.button("🔄 Refresh Now"):
-    st.cache_data.clear()
-    st.rerun()
+# ---- DASHBOARD (fragment: the 10s poll reruns only this block;
+# the title and scanner link above never re-execute) ----
+@st.fragment
+def render_dashboard():
+    st_autorefresh(interval=10_000, key="dash_tick")
 
-if df_attendance.empty:
-    st.warning("No roster data found. Check your Google Sheet.")
-    st.stop()
+    # Load Data
+    try:
+        df_attendance = load_roster()
+    except Exception as e:
+        st.error("Error loading roster data.")
+        st.exception(e)
+        df_attendance = pd.DataFrame()
+    # Change probe: one tiny single-column read per tick; the full log
+    # reload happens only when a new scan has actually landed. A failed
+    # probe falls back to the last seen value (i.e. "unchanged"), so a
+    # transient blip serves the cached log instead of killing the render
+    try:
+        latest_ts = latest_log_timestamp()
+    except Exception:
+        latest_ts = st.session_state.get("last_seen_log_ts")
+    if latest_ts != st.session_state.get("last_seen_log_ts"):
+        st.session_state["last_seen_log_ts"] = latest_ts
+        load_log.clear()
+    try:
+        df_log = load_log()
+    except Exception as e:
+        st.error("Error loading attendance log data.")
+        st.exception(e)
+        df_log = pd.DataFrame()
+
+    # Manual refresh buttons (roster cache is cleared separately — it has
+    # its own long TTL and rarely needs a reload)
+    btn1, btn2 = st.columns(2)
+    if btn1.button("🔄 Refresh Now"):
+        load_log.clear()
+        st.rerun()
+    if btn2.button("📋 Reload Roster"):
+        load_roster.clear()
+        st.rerun()
+
+    if df_attendance.empty:
+        st.warning("No roster data found. Check your Google Sheet.")
+        st.stop()
+
+    # Present IDs (unique() already deduplicates; no set() round-trip)
+    present_arr = (
+        df_log[LOG_ID_COL].unique()
+        if not df_log.empty else np.array([], dtype=object)
+    )
 
-# Metrics
-total = len(df_attendance)
-present = len(present_ids)
-absent = total - present
+    # Split the roster with one hashtable-backed membership mask — no
+    # intermediate status-string comparison per tab
+    present_mask = df_attendance[ROSTER_ID_COL].isin(present_arr).values
+
+    df_present = df_attendance.loc[present_mask].copy()
+    df_present[STATUS_COL] = "PRESENT"
+    df_absent = df_attendance.loc[~present_mask].copy()
+    df_absent[STATUS_COL] = "ABSENT"
+
+    # Last timestamp: form responses append chronologically, so the max is
+    # the final row — parse just that one value, not the column
+    last_update = (
+        pd.to_datetime(
+            df_log[TIMESTAMP_COL].iloc[-1],
+            format=TIMESTAMP_FMT, errors="coerce"
+        )
+        if len(df_log) else pd.NaT
+    )
+    last_update = (
+        "N/A" if pd.isna(last_update)
+        else last_update.strftime("%Y-%m-%d %I:%M:%S %p")
+    )
 
-c1, c2, c3, c4 = st.columns(4)
+    # Metrics
+    total = len(df_attendance)
+    present = int(present_mask.sum())
+    absent = total - present
 
-c1.metric("Total Students", total)
-c2.metric("Present", present)
-c3.metric("Absent", absent)
-c4.metric("Last Scan", last_update)
+    c1, c2, c3, c4 = st.columns(4)
 
-st.markdown("---")
+    c1.metric("Total Students", total)
+    c2.metric("Present", present)
+    c3.metric("Absent", absent)
+    c4.metric("Last Scan", last_update)
 
-# Tabs for Present & Absent
-tab1, tab2 = st.tabs([f"✅ Present ({present})", f"❌ Absent ({absent})"])
+    st.markdown("---")
 
-def style_df(df):
-    return df.style.applymap(
-        lambda x: "background-color:#d1fae5; color:#065f46; font-weight:bold;"
-        if x == "PRESENT"
-        else "background-color:#fee2e2; color:#991b1b;",
-        subset=[STATUS_COL]
-    )
+    # Tabs for Present & Absent
+    tab1, tab2 = st.tabs([f"✅ Present ({present})", f"❌ Absent ({absent})"])
 
-with tab1:
-    df_present = df_attendance[df_attendance[STATUS_COL] == "PRESENT"]
-    st.dataframe(
-        style_df(df_present.reset_index()),
-        use_container_width=True,
-        hide_index=True
-    )
+    with tab1:
+        st.dataframe(
+            df_present,
+            column_config=ROSTER_COLUMN_CONFIG,
+            use_container_width=True,
+            hide_index=True
+        )
 
-with tab2:
-    df_absent = df_attendance[df_attendance[STATUS_COL] == "ABSENT"]
-    st.dataframe(
-        style_df(df_absent.reset_index()),
-        use_container_width=True,
-        hide_index=True
-    )
+    with tab2:
+        st.dataframe(
+            df_absent,
+            column_config=ROSTER_COLUMN_CONFIG,
+            use_container_width=True,
+            hide_index=True
+        )
+
+render_dashboard()